@@ -0,0 +1,48 @@
+"""
+In-process response cache
+
+A small TTL + LRU cache for read-heavy endpoints. Entries are tagged with a
+version so a single invalidate() call retires everything cached before it,
+including results still being computed when the invalidation happened.
+
+The cache lives in one process. With several workers, invalidate() only
+affects the worker it runs in; elsewhere entries expire by TTL alone.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class TTLCache:
+    def __init__(self, ttl: float, maxsize: int = 256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.version = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, version: int) -> None:
+        """Store value unless the cache was invalidated since version was read"""
+        if self.ttl <= 0 or version != self.version:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Drop all entries and reject values computed before this call"""
+        self.version += 1
+        self._entries.clear()
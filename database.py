@@ -5,11 +5,13 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError, PyMongoError
 from datetime import datetime, timezone
 import os
 from dotenv import load_dotenv
-from typing import Union
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
@@ -22,14 +24,42 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    _client = AsyncIOMotorClient(
+        database_url,
+        maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", "50")),
+        minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", "10")),
+        maxIdleTimeMS=60000,
+        serverSelectionTimeoutMS=3000,
+        compressors=os.getenv("MONGO_COMPRESSORS", "zstd,zlib"),
+    )
     db = _client[database_name]
 
+class DatabaseUnavailable(PyMongoError):
+    """Raised when the database connection was never configured"""
+
+
+class PartialBulkInsert(Exception):
+    """Raised when an unordered batch insert succeeded for only some documents.
+
+    inserted_ids lines up with the input; failed positions hold None and are
+    described in errors as {"index": ..., "error": ...}.
+    """
+
+    def __init__(self, inserted_ids: List[Optional[str]], errors: List[dict]):
+        super().__init__(f"{len(errors)} of {len(inserted_ids)} documents failed to insert")
+        self.inserted_ids = inserted_ids
+        self.errors = errors
+
+
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
-    """Insert a single document with timestamp"""
+def get_collection(collection_name: str):
+    """Get a collection handle, failing if the database is not configured"""
     if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+        raise DatabaseUnavailable("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+    return db[collection_name]
+
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
+    """Insert a single document with timestamp"""
 
     # Convert Pydantic model to dict if needed
     if isinstance(data, BaseModel):
@@ -40,16 +70,84 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await get_collection(collection_name).insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
-    """Get documents from collection"""
-    if db is None:
-        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+async def create_documents(collection_name: str, items: List[Union[BaseModel, dict]]):
+    """Insert many documents with timestamps in a single unordered batch"""
+    if not items:
+        return []
+
+    now = datetime.now(timezone.utc)
+    docs = []
+    for data in items:
+        data_dict = data.model_dump() if isinstance(data, BaseModel) else data.copy()
+        data_dict['created_at'] = now
+        data_dict['updated_at'] = now
+        # Assigned up front so the written rows can still be reported on partial failure
+        data_dict.setdefault('_id', ObjectId())
+        docs.append(data_dict)
+
+    try:
+        result = await get_collection(collection_name).insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        errors = [{"index": err["index"], "error": err.get("errmsg", "")} for err in e.details.get("writeErrors", [])]
+        if not errors:
+            # Only a write concern error: the rows may or may not be durable
+            raise
+        failed = {err["index"] for err in errors}
+        inserted_ids = [None if i in failed else str(doc['_id']) for i, doc in enumerate(docs)]
+        raise PartialBulkInsert(inserted_ids, errors) from e
+    return [str(inserted_id) for inserted_id in result.inserted_ids]
+
+def find_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None):
+    """Get a cursor over documents in collection, optionally restricted to the projected fields"""
     
-    cursor = db[collection_name].find(filter_dict or {})
+    cursor = get_collection(collection_name).find(filter_dict or {}, projection)
     if limit:
         cursor = cursor.limit(limit)
-    
-    return list(cursor)
+    return cursor
+
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None, projection: dict = None):
+    """Get documents from collection, optionally restricted to the projected fields"""
+    cursor = find_documents(collection_name, filter_dict, limit, projection)
+    return await cursor.to_list(length=limit)
+
+async def ensure_indexes():
+    """Create the indexes backing the property search endpoint"""
+    if db is None:
+        return
+
+    properties = db["property"]
+    await properties.create_index(
+        [("title_en", "text"), ("description_en", "text"), ("title_ar", "text"), ("description_ar", "text")],
+        name="property_text",
+    )
+    await properties.create_index([("location_key", 1)])
+    await properties.create_index([("city_key", 1)])
+    await properties.create_index([("price", 1)])
+    await properties.create_index([("trigrams", 1)])
+    await properties.create_index([("property_type", 1), ("bedrooms", 1), ("bathrooms", 1)])
+    await properties.create_index(
+        [("property_type", 1), ("city_key", 1), ("price", 1), ("bedrooms", 1), ("bathrooms", 1)]
+    )
+
+def _normalized_key(field: str) -> dict:
+    """Aggregation form of main._search_key: trimmed lowercase string, or null"""
+    return {
+        "$cond": [
+            {"$eq": [{"$type": f"${field}"}, "string"]},
+            {"$toLower": {"$trim": {"input": f"${field}"}}},
+            None,
+        ]
+    }
+
+async def backfill_search_keys():
+    """Set location_key/city_key on properties written before those fields existed"""
+    if db is None:
+        return
+
+    await db["property"].update_many(
+        {"$or": [{"location_key": {"$exists": False}}, {"city_key": {"$exists": False}}]},
+        [{"$set": {"location_key": _normalized_key("location"), "city_key": _normalized_key("city")}}],
+    )
@@ -1,13 +1,80 @@
 import os
+import re
+import time
+import logging
+from contextlib import asynccontextmanager
 from typing import List, Optional
-from fastapi import FastAPI, HTTPException
+import jwt
+import msgspec
+import orjson
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+
+from cache import TTLCache
+from database import (
+    db, get_collection, create_document, create_documents, find_documents, ensure_indexes, backfill_search_keys,
+    PartialBulkInsert,
+)
+from schemas import Property, Lead, Viewing, Favorite, User, MaintenanceRequest, MaintenanceStatus, Agent
+
+logger = logging.getLogger(__name__)
+
+
+_OID_RE = re.compile(r"[0-9a-fA-F]{24}")
+
+
+def _object_id(value: str) -> ObjectId:
+    """Parse a path id, rejecting malformed ones with 400 before touching bson"""
+    if not _OID_RE.fullmatch(value):
+        raise HTTPException(status_code=400, detail="Invalid id")
+    try:
+        return ObjectId(value)
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid id")
+
+
+def _db_error(e: PyMongoError) -> HTTPException:
+    """Log a database failure and turn it into a 503 without leaking details"""
+    logger.error("Database error: %s", e)
+    return HTTPException(status_code=503, detail="Database unavailable")
+
+
+def _json_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _dumps(doc) -> bytes:
+    return orjson.dumps(doc, default=_json_default)
 
-from database import db, create_document, get_documents
-from schemas import Property, Lead, Viewing, Favorite, User, MaintenanceRequest, Agent
 
-app = FastAPI(title="Mouqab Al Noor Real Estate API")
+class MongoJSONResponse(ORJSONResponse):
+    """orjson response that also encodes ObjectId values as hex strings"""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    try:
+        await ensure_indexes()
+        await backfill_search_keys()
+        await backfill_trigrams()
+    except PyMongoError as e:
+        logger.warning("Could not prepare search indexes: %s", e)
+    yield
+
+
+app = FastAPI(title="Mouqab Al Noor Real Estate API", default_response_class=MongoJSONResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -16,20 +83,63 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
+
+async def _stream_items(cursor, on_complete=None) -> StreamingResponse:
+    """Stream a cursor as {"items": [...]} without building the result list.
+
+    The first document is fetched before the response starts so query errors
+    still surface as an HTTP error instead of a truncated body. If given,
+    on_complete is called with the full body once the cursor is exhausted.
+    """
+    first = await anext(cursor, None)
+
+    async def chunks():
+        yield b'{"items":['
+        if first is not None:
+            yield _dumps(first)
+            async for doc in cursor:
+                yield b","
+                yield _dumps(doc)
+        yield b"]}"
+
+    async def body():
+        if on_complete is None:
+            async for chunk in chunks():
+                yield chunk
+            return
+        parts = []
+        async for chunk in chunks():
+            parts.append(chunk)
+            yield chunk
+        on_complete(b"".join(parts))
+
+    return StreamingResponse(body(), media_type="application/json")
 
 
 @app.get("/")
-def read_root():
+async def read_root():
     return {"message": "Mouqab Al Noor API is running"}
 
 
+# Collection names for /test; health checks poll it far more often than collections change
+collections_cache = TTLCache(ttl=30, maxsize=1)
+
+
+# Parts of the /test response that cannot change while the process runs
+_TEST_STATIC = {
+    "backend": "✅ Running",
+    "database_url": "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set",
+    "database_name": "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set",
+}
+
+
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
-        "backend": "✅ Running",
+        **_TEST_STATIC,
         "database": "❌ Not Available",
-        "database_url": None,
-        "database_name": None,
         "connection_status": "Not Connected",
         "collections": []
     }
@@ -37,7 +147,10 @@ def test_database():
         if db is not None:
             response["database"] = "✅ Available"
             try:
-                collections = db.list_collection_names()
+                collections = collections_cache.get("names")
+                if collections is None:
+                    collections = await db.list_collection_names()
+                    collections_cache.set("names", collections, collections_cache.version)
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
                 response["connection_status"] = "Connected"
@@ -48,13 +161,11 @@ def test_database():
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:80]}"
 
-    response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
-    response["database_name"] = "✅ Set" if os.getenv("DATABASE_NAME") else "❌ Not Set"
     return response
 
 
 # --------- Public Search Endpoints ---------
-class SearchFilters(BaseModel):
+class SearchFilters(msgspec.Struct, omit_defaults=True):
     q: Optional[str] = None
     location: Optional[str] = None
     city: Optional[str] = None
@@ -64,20 +175,112 @@ class SearchFilters(BaseModel):
     bedrooms: Optional[int] = None
     bathrooms: Optional[int] = None
     featured: Optional[bool] = None
+    prefix: bool = False  # match location/city by prefix instead of exact value
 
 
-@app.post("/properties/search")
-def search_properties(filters: SearchFilters):
+async def parse_filters(request: Request) -> SearchFilters:
+    """Decode and validate the search body in one msgspec pass"""
+    try:
+        return msgspec.json.decode(await request.body(), type=SearchFilters, strict=False)
+    except (msgspec.ValidationError, msgspec.DecodeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+# parse_filters reads the raw body, so FastAPI cannot infer the schema itself
+SEARCH_FILTERS_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": msgspec.json.schema(SearchFilters)["$defs"]["SearchFilters"]},
+        },
+    },
+}
+
+
+# Search results keyed by filters. Each worker has its own copy and a write only
+# clears the copy in the worker that handled it, so other workers may serve
+# stale results for up to SEARCH_CACHE_TTL seconds (set it to 0 to disable).
+search_cache = TTLCache(ttl=float(os.getenv("SEARCH_CACHE_TTL", "60")))
+
+
+# Fields needed to render a search result card; full documents come from GET /properties/{id}
+PROPERTY_LISTING_PROJECTION = {
+    "title_en": 1,
+    "title_ar": 1,
+    "price": 1,
+    "currency": 1,
+    "location": 1,
+    "city": 1,
+    "property_type": 1,
+    "bedrooms": 1,
+    "bathrooms": 1,
+    "featured": 1,
+    "images": {"$slice": 1},
+}
+
+
+# Search-only fields derived at write time; never part of the API response
+PROPERTY_INTERNAL_FIELDS = {"trigrams": 0, "location_key": 0, "city_key": 0}
+
+
+def _search_key(value: Optional[str]) -> Optional[str]:
+    """Normalized form of location/city used for indexed lookups"""
+    return value.strip().lower() if value else None
+
+
+def _trigrams(*texts: Optional[str]) -> List[str]:
+    """Distinct lowercase 3-character substrings of each word in texts"""
+    words = " ".join(t for t in texts if t).lower().split()
+    return sorted({w[i:i + 3] for w in words for i in range(len(w) - 2)})
+
+
+async def backfill_trigrams(batch_size: int = 500):
+    """Compute trigrams for properties written before the field existed"""
+    if db is None:
+        return
+
+    properties = get_collection("property")
+    cursor = properties.find({"trigrams": {"$exists": False}}, {"title_en": 1, "description_en": 1})
+    ops = []
+    async for doc in cursor:
+        grams = _trigrams(doc.get("title_en"), doc.get("description_en"))
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {"trigrams": grams}}))
+        if len(ops) >= batch_size:
+            await properties.bulk_write(ops, ordered=False)
+            ops = []
+    if ops:
+        await properties.bulk_write(ops, ordered=False)
+
+
+def _key_condition(value: str, prefix: bool):
+    key = _search_key(value)
+    return {"$regex": f"^{re.escape(key)}"} if prefix else key
+
+
+@app.post("/properties/search", openapi_extra=SEARCH_FILTERS_OPENAPI)
+async def search_properties(filters: SearchFilters = Depends(parse_filters)):
+    cache_key = msgspec.json.encode(filters)
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+    cache_version = search_cache.version
+
     query = {}
     if filters.q:
-        query["$or"] = [
-            {"title_en": {"$regex": filters.q, "$options": "i"}},
-            {"description_en": {"$regex": filters.q, "$options": "i"}},
-        ]
+        qgrams = _trigrams(filters.q)
+        if qgrams:
+            # Trigrams narrow the candidates through the index; the regex then
+            # only runs on those candidates to confirm the actual substring
+            pattern = {"$regex": re.escape(filters.q.strip()), "$options": "i"}
+            query["trigrams"] = {"$all": qgrams}
+            query["$or"] = [{"title_en": pattern}, {"description_en": pattern}]
+        else:
+            # Too short for trigrams: fall back to whole-word text search
+            query["$text"] = {"$search": filters.q}
     if filters.location:
-        query["location"] = {"$regex": filters.location, "$options": "i"}
+        query["location_key"] = _key_condition(filters.location, filters.prefix)
     if filters.city:
-        query["city"] = {"$regex": filters.city, "$options": "i"}
+        query["city_key"] = _key_condition(filters.city, filters.prefix)
     if filters.property_type:
         query["property_type"] = filters.property_type
     if filters.bedrooms is not None:
@@ -95,127 +298,172 @@ def search_properties(filters: SearchFilters):
         query["featured"] = filters.featured
 
     try:
-        results = get_documents("property", query, limit=100)
-        for doc in results:
-            if "_id" in doc:
-                doc["_id"] = str(doc["_id"])  # type: ignore
-        return {"items": results}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        cursor = find_documents("property", query, limit=100, projection=PROPERTY_LISTING_PROJECTION)
+        return await _stream_items(cursor, lambda body: search_cache.set(cache_key, body, cache_version))
+    except PyMongoError as e:
+        raise _db_error(e) from e
 
 
 # --------- Property CRUD (basic) ---------
+def _property_doc(payload: Property) -> dict:
+    doc = payload.model_dump()
+    doc["location_key"] = _search_key(payload.location)
+    doc["city_key"] = _search_key(payload.city)
+    doc["trigrams"] = _trigrams(payload.title_en, payload.description_en)
+    return doc
+
+
 @app.post("/properties")
-def create_property(payload: Property):
+async def create_property(payload: Property):
     try:
-        inserted_id = create_document("property", payload)
+        inserted_id = await create_document("property", _property_doc(payload))
+        search_cache.invalidate()
         return {"id": inserted_id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except PyMongoError as e:
+        raise _db_error(e) from e
+
+
+MAX_BULK_PROPERTIES = 500
+
+
+@app.post("/properties/bulk")
+async def create_properties(payload: List[Property]):
+    if len(payload) > MAX_BULK_PROPERTIES:
+        raise HTTPException(status_code=413, detail=f"At most {MAX_BULK_PROPERTIES} properties per request")
+    try:
+        inserted_ids = await create_documents("property", [_property_doc(p) for p in payload])
+        return {"ids": inserted_ids}
+    except PartialBulkInsert as e:
+        # 207 so clients keep the ids that were written and retry only the failures
+        return MongoJSONResponse({"ids": e.inserted_ids, "errors": e.errors}, status_code=207)
+    except PyMongoError as e:
+        raise _db_error(e) from e
+    finally:
+        # An unordered batch may be partially written even when it fails
+        search_cache.invalidate()
 
 
 @app.get("/properties/{property_id}")
-def get_property(property_id: str):
-    from bson import ObjectId
+async def get_property(property_id: str):
+    oid = _object_id(property_id)
     try:
-        doc = db["property"].find_one({"_id": ObjectId(property_id)})
+        doc = await get_collection("property").find_one({"_id": oid}, PROPERTY_INTERNAL_FIELDS)
         if not doc:
             raise HTTPException(status_code=404, detail="Property not found")
-        doc["_id"] = str(doc["_id"])  # type: ignore
-        return doc
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        # Returned directly so ObjectId/datetime go straight to orjson
+        return MongoJSONResponse(doc)
+    except PyMongoError as e:
+        raise _db_error(e) from e
 
 
 # --------- Leads, Viewings, Favorites ---------
 @app.post("/leads")
-def create_lead(payload: Lead):
+async def create_lead(payload: Lead):
     try:
-        inserted_id = create_document("lead", payload)
+        inserted_id = await create_document("lead", payload)
         return {"id": inserted_id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except PyMongoError as e:
+        raise _db_error(e) from e
 
 
 @app.post("/viewings")
-def create_viewing(payload: Viewing):
+async def create_viewing(payload: Viewing):
     try:
-        inserted_id = create_document("viewing", payload)
+        inserted_id = await create_document("viewing", payload)
         return {"id": inserted_id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except PyMongoError as e:
+        raise _db_error(e) from e
 
 
 @app.post("/favorites")
-def add_favorite(payload: Favorite):
+async def add_favorite(payload: Favorite):
     try:
-        inserted_id = create_document("favorite", payload)
+        inserted_id = await create_document("favorite", payload)
         return {"id": inserted_id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except PyMongoError as e:
+        raise _db_error(e) from e
 
 
 @app.get("/favorites/{user_id}")
-def list_favorites(user_id: str):
+async def list_favorites(user_id: str):
     try:
-        favs = get_documents("favorite", {"user_id": user_id}, limit=200)
-        for f in favs:
-            if "_id" in f:
-                f["_id"] = str(f["_id"])  # type: ignore
-        return {"items": favs}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        cursor = find_documents("favorite", {"user_id": user_id}, limit=200)
+        return await _stream_items(cursor)
+    except PyMongoError as e:
+        raise _db_error(e) from e
 
 
 # --------- Building Maintenance ---------
 @app.post("/maintenance-requests")
-def create_maintenance(payload: MaintenanceRequest):
+async def create_maintenance(payload: MaintenanceRequest):
     try:
-        inserted_id = create_document("maintenancerequest", payload)
+        inserted_id = await create_document("maintenancerequest", payload)
         return {"id": inserted_id}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except PyMongoError as e:
+        raise _db_error(e) from e
 
 
 @app.get("/maintenance-requests")
-def list_maintenance(status: Optional[str] = None):
+async def list_maintenance(status: Optional[str] = None):
     query = {}
     if status:
         query["status"] = status
     try:
-        items = get_documents("maintenancerequest", query, limit=200)
-        for it in items:
-            if "_id" in it:
-                it["_id"] = str(it["_id"])  # type: ignore
-        return {"items": items}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+        cursor = find_documents("maintenancerequest", query, limit=200)
+        return await _stream_items(cursor)
+    except PyMongoError as e:
+        raise _db_error(e) from e
+
+
+class StatusUpdate(BaseModel):
+    status: MaintenanceStatus
 
 
 @app.patch("/maintenance-requests/{request_id}")
-def update_maintenance_status(request_id: str, status: str):
-    from bson import ObjectId
+async def update_maintenance_status(request_id: str, body: StatusUpdate):
+    oid = _object_id(request_id)
     try:
-        res = db["maintenancerequest"].update_one({"_id": ObjectId(request_id)}, {"$set": {"status": status}})
+        res = await get_collection("maintenancerequest").update_one({"_id": oid}, {"$set": {"status": body.status}})
         if res.matched_count == 0:
             raise HTTPException(status_code=404, detail="Maintenance request not found")
         return {"ok": True}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    except PyMongoError as e:
+        raise _db_error(e) from e
 
 
 # ---- Admin basics (demo login) ----
+# Shared HMAC key so any worker or replica can verify tokens issued by another
+JWT_SECRET = os.getenv("JWT_SECRET")
+JWT_TTL_SECONDS = int(os.getenv("JWT_TTL_SECONDS", 3600))
+# There is no user store to check passwords against yet, so signing tokens for
+# arbitrary credentials must be switched on explicitly (local development only)
+ALLOW_UNVERIFIED_LOGIN = os.getenv("ALLOW_UNVERIFIED_LOGIN") == "1"
+
+
 class LoginPayload(BaseModel):
     email: str
     password: str
 
 
 @app.post("/auth/login")
-def login(_: LoginPayload):
-    return {"token": "demo-token"}
+async def login(payload: LoginPayload):
+    if not ALLOW_UNVERIFIED_LOGIN:
+        raise HTTPException(status_code=503, detail="Login unavailable: credentials cannot be verified yet.")
+    if not JWT_SECRET:
+        raise HTTPException(status_code=503, detail="Login not configured. Set JWT_SECRET.")
+    claims = {"sub": payload.email, "exp": int(time.time()) + JWT_TTL_SECONDS}
+    return {"token": jwt.encode(claims, JWT_SECRET, algorithm="HS256")}
 
 
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    uvicorn.run(
+        "main:app",
+        host="0.0.0.0",
+        port=port,
+        workers=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        loop="uvloop",
+        http="httptools",
+        log_level="info",
+    )
@@ -5,12 +5,22 @@ Each Pydantic model represents a MongoDB collection. The collection name
 is the lowercase of the class name (e.g., Property -> "property").
 """
 
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Literal, Type, TypeVar
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Shared by every collection model: drop unknown keys rather than storing them
+MODEL_CONFIG = ConfigDict(extra="ignore", frozen=False, populate_by_name=True)
+
+Currency = Literal["AED", "USD", "EUR"]
+MaintenanceStatus = Literal["open", "in_progress", "resolved", "closed"]
 
 # Core domain models
 
 class User(BaseModel):
+    model_config = MODEL_CONFIG
+
     name: str = Field(..., description="Full name")
     email: str = Field(..., description="Email address")
     phone: Optional[str] = Field(None, description="Phone number")
@@ -20,6 +30,8 @@ class User(BaseModel):
     is_active: bool = True
 
 class Agent(BaseModel):
+    model_config = MODEL_CONFIG
+
     name: str
     email: Optional[str] = None
     phone: Optional[str] = None
@@ -29,12 +41,14 @@ class Agent(BaseModel):
     languages: List[str] = ["en"]
 
 class Property(BaseModel):
+    model_config = MODEL_CONFIG
+
     title_en: str
     title_ar: str
     description_en: Optional[str] = None
     description_ar: Optional[str] = None
     price: float = Field(..., ge=0)
-    currency: str = Field("AED")
+    currency: Currency = Field("AED")
     location: str
     city: Optional[str] = None
     country: Optional[str] = None
@@ -51,6 +65,8 @@ class Property(BaseModel):
     listed_by: Optional[str] = Field(None, description="agent user id")
 
 class Lead(BaseModel):
+    model_config = MODEL_CONFIG
+
     property_id: Optional[str] = None
     name: str
     email: Optional[str] = None
@@ -59,6 +75,8 @@ class Lead(BaseModel):
     source: str = Field("website", description="website | whatsapp | phone | email")
 
 class Viewing(BaseModel):
+    model_config = MODEL_CONFIG
+
     property_id: str
     user_id: Optional[str] = None
     name: Optional[str] = None
@@ -68,16 +86,45 @@ class Viewing(BaseModel):
     notes: Optional[str] = None
 
 class Favorite(BaseModel):
+    model_config = MODEL_CONFIG
+
     user_id: str
     property_id: str
 
 class MaintenanceRequest(BaseModel):
+    model_config = MODEL_CONFIG
+
     building: str
     unit: Optional[str] = None
     category: str = Field(..., description="plumbing | electrical | hvac | cleaning | other")
     priority: str = Field("medium", description="low | medium | high | urgent")
     description: Optional[str] = None
-    status: str = Field("open", description="open | in_progress | resolved | closed")
+    status: MaintenanceStatus = Field("open", description="open | in_progress | resolved | closed")
     requested_by: Optional[str] = None  # user id or name
     contact_phone: Optional[str] = None
     photos: Optional[List[str]] = []
+
+def _build_schemas() -> None:
+    """Build validators and serializers at import time.
+
+    Then the first request, and forked workers, start with complete schemas.
+    model_rebuild() is a no-op for models that pydantic already finished
+    building when the class was defined.
+    """
+    for model in (Property, Lead, Viewing, Favorite, User, MaintenanceRequest, Agent):
+        model.model_rebuild()
+        _ = (model.__pydantic_validator__, model.__pydantic_serializer__)
+
+
+_build_schemas()
+
+
+# Helpers
+
+def load_trusted(model_cls: Type[ModelT], doc: dict) -> ModelT:
+    """Build a model from a stored document without re-running validation.
+
+    Only use this for documents that were validated on the way in; keys the
+    model does not declare (e.g. _id, created_at) are dropped.
+    """
+    return model_cls.model_construct(**doc)